@@ -9,6 +9,7 @@ Only allows alerts for signals that:
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 
 class FreshSignalDeduplicator:
@@ -16,6 +17,9 @@ class FreshSignalDeduplicator:
         self.freshness_window = timedelta(minutes=freshness_minutes)
         self.cache_file = os.path.join(os.path.dirname(__file__), '..', '..', 'cache', 'fresh_alerts_1h.json')
         self.signal_cache = self.load_cache()
+        self._dirty = False
+        # Analyzer workers check and record signals concurrently
+        self._lock = threading.Lock()
     
     def load_cache(self):
         try:
@@ -31,14 +35,22 @@ class FreshSignalDeduplicator:
         os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
         with open(self.cache_file, 'w') as f:
             json.dump(self.signal_cache, f, indent=2, default=str)
+        self._dirty = False
     
-    def is_signal_fresh_and_new(self, symbol, signal_type, signal_timestamp):
+    def flush(self):
+        """Write the cache once if new signals were recorded since the last save"""
+        if self._dirty:
+            self.save_cache()
+    
+    def is_signal_fresh_and_new(self, symbol, signal_type, signal_timestamp, now=None):
         """
         Check if signal is:
         1. Fresh (within last 1 hour for 1h candles)
         2. New (not already alerted)
+        Accepted signals are recorded in memory - call flush() once per run to persist
+        `now` (UTC) lets callers pass one reference time for a whole run
         """
-        current_time = datetime.utcnow()
+        current_time = now or datetime.utcnow()
         
         # Check 1: Is signal fresh (within 1-hour window for 1h)?
         if isinstance(signal_timestamp, str):
@@ -49,45 +61,44 @@ class FreshSignalDeduplicator:
         
         if not is_fresh:
             hours = time_since_signal.total_seconds() / 3600
-            print(f"❌ {symbol} {signal_type}: STALE 1h signal ({hours:.1f} hours old)")
+            print(f"❌ {symbol} {signal_type}: STALE 1h signal ({hours:.1f} hours old)\n", end="")
             return False
         
         # Check 2: Is signal new (not already alerted)?
         signal_key = f"{symbol}_{signal_type}_{signal_timestamp.strftime('%Y%m%d_%H%M%S')}"
         
-        if signal_key in self.signal_cache:
-            print(f"❌ {symbol} {signal_type}: DUPLICATE 1h signal (already alerted)")
-            return False
+        with self._lock:
+            if signal_key in self.signal_cache:
+                print(f"❌ {symbol} {signal_type}: DUPLICATE 1h signal (already alerted)\n", end="")
+                return False
+            
+            # Signal is both fresh and new - allow it
+            self.signal_cache[signal_key] = {
+                'alerted_at': current_time.isoformat(),
+                'signal_time': signal_timestamp.isoformat(),
+                'freshness_seconds': time_since_signal.total_seconds(),
+                'timeframe': '1h'
+            }
+            self._dirty = True
         
-        # Signal is both fresh and new - allow it
-        self.signal_cache[signal_key] = {
-            'alerted_at': current_time.isoformat(),
-            'signal_time': signal_timestamp.isoformat(),
-            'freshness_seconds': time_since_signal.total_seconds(),
-            'timeframe': '1h'
-        }
-        
-        self.save_cache()
         minutes_ago = time_since_signal.total_seconds() / 60
-        print(f"✅ {symbol} {signal_type}: FRESH & NEW 1h signal ({minutes_ago:.0f} min ago)")
+        print(f"✅ {symbol} {signal_type}: FRESH & NEW 1h signal ({minutes_ago:.0f} min ago)\n", end="")
         return True
     
     def cleanup_old_signals(self):
         """Remove signal records older than 6 hours"""
         cutoff_time = datetime.utcnow() - timedelta(hours=6)
-        old_keys = []
+        kept = {}
         
         for key, data in self.signal_cache.items():
             try:
-                alerted_at = datetime.fromisoformat(data['alerted_at'])
-                if alerted_at < cutoff_time:
-                    old_keys.append(key)
+                if datetime.fromisoformat(data['alerted_at']) >= cutoff_time:
+                    kept[key] = data
             except (ValueError, TypeError, KeyError):
-                old_keys.append(key)  # Remove invalid entries
-        
-        for key in old_keys:
-            del self.signal_cache[key]
+                pass  # Drop invalid entries
         
-        if old_keys:
+        removed = len(self.signal_cache) - len(kept)
+        if removed:
+            self.signal_cache = kept
             self.save_cache()
-            print(f"🧹 Cleaned {len(old_keys)} old 1h signal records")
+            print(f"🧹 Cleaned {removed} old 1h signal records")
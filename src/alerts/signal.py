@@ -0,0 +1,27 @@
+"""
+Lightweight Signal record passed from the analyzer to the alert layer
+Slotted dataclass instead of a plain dict - fixed attribute slots, no per-key hashing
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Optional
+
+@dataclass(slots=True)
+class Signal:
+    symbol: str
+    signal_type: str
+    price: float
+    change_24h: float
+    market_cap: float
+    wt1: float
+    wt2: float
+    exchange: str
+    signal_age_seconds: float = 0.0
+    timestamp: Optional[Any] = None
+    coin_data: Optional[dict] = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Signal from the legacy dict format (unknown keys ignored)"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
@@ -5,126 +5,161 @@ Sends ALL signals in ONE message - no more spam!
 
 import os
 import requests
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def create_telegram_session():
+    """Create a keep-alive session so repeated alerts reuse one TLS connection"""
+    session = requests.Session()
+    
+    # sendMessage isn't idempotent: only retry when the request never reached Telegram
+    # (connect errors) or it answered with a retryable status - a lost response after
+    # Telegram accepted the message must not resend it
+    retry_strategy = Retry(
+        total=3,
+        connect=3,
+        read=0,
+        other=0,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+    )
+    
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry_strategy)
+    session.mount("https://", adapter)
+    return session
+
+_SESSION = create_telegram_session()
+
+# Credentials don't change within a run - resolve them once at import
+_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+_CHAT_ID = os.getenv('HIGH_RISK_TELEGRAM_CHAT_ID')
+_SEND_URL = f"https://api.telegram.org/bot{_BOT_TOKEN}/sendMessage" if _BOT_TOKEN else None
+
+IST_OFFSET = timedelta(hours=5, minutes=30)
+IST = timezone(IST_OFFSET)
 
 def get_ist_time():
-    """Convert UTC to IST"""
-    utc_now = datetime.utcnow()
-    return utc_now + timedelta(hours=5, minutes=30)
+    """Current time in IST"""
+    return datetime.now(IST)
+
+# Price precision by magnitude: < $0.001, < $1, everything else
+_PRICE_THRESHOLDS = (0.001, 1)
+_PRICE_FORMATS = ("${:.8f}", "${:.4f}", "${:.3f}")
+
+def _format_price(price):
+    """Format a price with precision picked from the threshold table"""
+    return _PRICE_FORMATS[bisect_right(_PRICE_THRESHOLDS, price)].format(price)
+
+@lru_cache(maxsize=4096)
+def _tv_link(symbol, interval):
+    """TradingView chart link for a symbol - same coins recur every cycle"""
+    clean_symbol = symbol.replace('USDT', '').replace('USD', '')
+    return f"https://www.tradingview.com/chart/?symbol={clean_symbol}USDT&interval={interval}"
+
+_LINE_TMPL = (
+    "{i}. *{symbol}* | {price_fmt} | {change:+.1f}%\n"
+    "   Cap: ${cap:.0f}M | WT: {wt1:.1f}/{wt2:.1f}\n"
+    "   {exchange} | ⚡{age:.0f}s ago | [Chart →]({tv})"
+)
+
+def _format_signal_line(i, signal):
+    """Format one numbered Signal entry (three lines) for the alert message"""
+    symbol = signal.symbol
+    return _LINE_TMPL.format(
+        i=i,
+        symbol=symbol,
+        price_fmt=_format_price(signal.price),
+        change=signal.change_24h,
+        cap=signal.market_cap / 1_000_000,
+        wt1=signal.wt1,
+        wt2=signal.wt2,
+        exchange=signal.exchange,
+        age=signal.signal_age_seconds,
+        tv=_tv_link(symbol, 60),  # TradingView link for 1h
+    )
 
-def send_consolidated_alert(all_signals, timeframe="1h"):
+def _render_section(title, signals):
+    """Lines for one titled section of numbered signal entries"""
+    lines = ["", title, ""]
+    for i, signal in enumerate(signals, 1):
+        lines.append(_format_signal_line(i, signal))
+    return lines
+
+def new_signal_buckets():
+    """Empty per-cycle signal buckets, pre-split by signal type"""
+    return {'BUY': [], 'SELL': [], 'age_sum': 0.0, 'n': 0}
+
+def add_signal_to_buckets(buckets, signal):
+    """Route a detected Signal into its bucket as it is produced"""
+    buckets[signal.signal_type].append(signal)
+    buckets['age_sum'] += signal.signal_age_seconds
+    buckets['n'] += 1
+
+def send_consolidated_alert(buckets, timeframe="1h"):
     """
     Send ONE consolidated message with ALL detected 1h signals
+    Signals arrive pre-split by type (see new_signal_buckets)
     """
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    chat_id = os.getenv('HIGH_RISK_TELEGRAM_CHAT_ID')
-    
-    if not bot_token or not chat_id or not all_signals:
+    if not _SEND_URL or not _CHAT_ID or not buckets or not buckets['n']:
         return False
     
     # Current IST time
     ist_time = get_ist_time()
     current_time_str = ist_time.strftime('%H:%M:%S IST')
     
-    # Group signals by type
-    buy_signals = [s for s in all_signals if s['signal_type'] == 'BUY']
-    sell_signals = [s for s in all_signals if s['signal_type'] == 'SELL']
+    buy_signals = buckets['BUY']
+    sell_signals = buckets['SELL']
+    total = buckets['n']
     
-    # Build consolidated message
-    message = f"""🔧 *EXACT CIPHERB {timeframe.upper()} ALERT*
-
-🎯 *{len(all_signals)} PRECISE SIGNALS*
-🕐 *{current_time_str}*
-⏰ *Timeframe: {timeframe.upper()} Candles*
+    # Build consolidated message as a list of lines, joined once at the end
+    tf = timeframe.upper()
+    parts = [
+        f"🔧 *EXACT CIPHERB {tf} ALERT*",
+        "",
+        f"🎯 *{total} PRECISE SIGNALS*",
+        f"🕐 *{current_time_str}*",
+        f"⏰ *Timeframe: {tf} Candles*",
+    ]
 
-"""
-
-    # Add BUY signals section
+    # Add BUY / SELL signal sections
     if buy_signals:
-        message += "🟢 *BUY SIGNALS:*\n"
-        for i, signal in enumerate(buy_signals, 1):
-            symbol = signal['symbol']
-            price = signal['price']
-            change_24h = signal['change_24h']
-            market_cap_m = signal['market_cap'] / 1_000_000
-            wt1 = signal['wt1']
-            wt2 = signal['wt2']
-            exchange = signal['exchange']
-            age_s = signal.get('signal_age_seconds', 0)
-            
-            # Format price
-            if price < 0.001:
-                price_fmt = f"${price:.8f}"
-            elif price < 1:
-                price_fmt = f"${price:.4f}"
-            else:
-                price_fmt = f"${price:.3f}"
-            
-            # TradingView link for 1h
-            clean_symbol = symbol.replace('USDT', '').replace('USD', '')
-            tv_link = f"https://www.tradingview.com/chart/?symbol={clean_symbol}USDT&interval=60"
-            
-            message += f"""
-{i}. *{symbol}* | {price_fmt} | {change_24h:+.1f}%
-   Cap: ${market_cap_m:.0f}M | WT: {wt1:.1f}/{wt2:.1f}
-   {exchange} | ⚡{age_s:.0f}s ago | [Chart →]({tv_link})"""
-    
-    # Add SELL signals section
+        parts += _render_section("🟢 *BUY SIGNALS:*", buy_signals)
     if sell_signals:
-        message += f"\n\n🔴 *SELL SIGNALS:*\n"
-        for i, signal in enumerate(sell_signals, 1):
-            symbol = signal['symbol']
-            price = signal['price']
-            change_24h = signal['change_24h']
-            market_cap_m = signal['market_cap'] / 1_000_000
-            wt1 = signal['wt1']
-            wt2 = signal['wt2']
-            exchange = signal['exchange']
-            age_s = signal.get('signal_age_seconds', 0)
-            
-            # Format price
-            if price < 0.001:
-                price_fmt = f"${price:.8f}"
-            elif price < 1:
-                price_fmt = f"${price:.4f}"
-            else:
-                price_fmt = f"${price:.3f}"
-            
-            # TradingView link for 1h
-            clean_symbol = symbol.replace('USDT', '').replace('USD', '')
-            tv_link = f"https://www.tradingview.com/chart/?symbol={clean_symbol}USDT&interval=60"
-            
-            message += f"""
-{i}. *{symbol}* | {price_fmt} | {change_24h:+.1f}%
-   Cap: ${market_cap_m:.0f}M | WT: {wt1:.1f}/{wt2:.1f}
-   {exchange} | ⚡{age_s:.0f}s ago | [Chart →]({tv_link})"""
+        if not buy_signals:
+            parts += ["", ""]  # Original layout: SELL-only alerts keep the extra gap under the header
+        parts += _render_section("🔴 *SELL SIGNALS:*", sell_signals)
     
     # Footer
-    avg_age = sum(s.get('signal_age_seconds', 0) for s in all_signals) / len(all_signals)
-    message += f"""
-
-📊 *FRESH {timeframe.upper()} SIGNAL SUMMARY:*
-• Total Signals: {len(all_signals)} (avg age: {avg_age:.0f}s)
-• Buy Signals: {len(buy_signals)}
-• Sell Signals: {len(sell_signals)}
-• Fresh Detection: ✅ No duplicates or stale alerts
-• Timeframe: {timeframe.upper()} candles only
-
-🎯 *Fresh {timeframe.upper()} CipherB System v2.0*"""
+    avg_age = buckets['age_sum'] / total
+    parts += [
+        "",
+        f"📊 *FRESH {tf} SIGNAL SUMMARY:*",
+        f"• Total Signals: {total} (avg age: {avg_age:.0f}s)",
+        f"• Buy Signals: {len(buy_signals)}",
+        f"• Sell Signals: {len(sell_signals)}",
+        "• Fresh Detection: ✅ No duplicates or stale alerts",
+        f"• Timeframe: {tf} candles only",
+        "",
+        f"🎯 *Fresh {tf} CipherB System v2.0*",
+    ]
+    message = "\n".join(parts)
 
     # Send single consolidated message
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     payload = {
-        'chat_id': chat_id,
+        'chat_id': _CHAT_ID,
         'text': message,
         'parse_mode': 'Markdown',
         'disable_web_page_preview': False
     }
     
     try:
-        response = requests.post(url, json=payload, timeout=30)
+        response = _SESSION.post(_SEND_URL, json=payload, timeout=30)
         response.raise_for_status()
-        print(f"📱 Consolidated {timeframe} alert sent: {len(all_signals)} signals")
+        print(f"📱 Consolidated {timeframe} alert sent: {total} signals")
         return True
     except Exception as e:
         print(f"❌ Alert failed: {e}")
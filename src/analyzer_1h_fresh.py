@@ -11,34 +11,47 @@ import os
 import sys
 import time
 import json
+import threading
 import ccxt
+import numpy as np
 import pandas as pd
 import yaml
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # LibYAML bindings, parses in C
+except ImportError:
+    from yaml import SafeLoader
 
 sys.path.insert(0, os.path.dirname(__file__))
-from alerts.telegram_batch import send_consolidated_alert
+from alerts.telegram_batch import send_consolidated_alert, new_signal_buckets, add_signal_to_buckets, IST_OFFSET, get_ist_time
 from alerts.deduplication_fresh import FreshSignalDeduplicator
+from alerts.signal import Signal
 from indicators.cipherb_exact import detect_exact_cipherb_signals
 
-def get_ist_time():
-    """Convert UTC to IST"""
-    utc_now = datetime.utcnow()
-    return utc_now + timedelta(hours=5, minutes=30)
-
 class Fresh1hAnalyzer:
     def __init__(self):
         self.config = self.load_config()
         # Use 65 minutes to catch signals from the full 1-hour candle + buffer
         self.deduplicator = FreshSignalDeduplicator(freshness_minutes=65)
-        self.exchanges = self.init_exchanges()
+        self.exchange_factories = self.init_exchanges()
+        # ccxt sync clients aren't thread-safe - each worker thread builds its own
+        self._thread_local = threading.local()
+        # Request pacing is shared across workers: one next-slot limiter per exchange
+        self._rate_locks = {name: threading.Lock() for name in self.exchange_factories}
+        self._next_request_at = dict.fromkeys(self.exchange_factories, 0.0)
+        # Market lists are downloaded once per exchange and seeded into every worker's client
+        self._markets = {}
+        self._markets_locks = {name: threading.Lock() for name in self.exchange_factories}
         self.blocked_coins = self.load_blocked_coins()
         self.market_data = self.load_market_data()
     
     def load_blocked_coins(self):
         """
         Load blocked coins from blocked_coins.txt
-        Returns set of uppercase coin symbols to block
+        Returns frozenset of uppercase coin symbols to block
         """
         blocked_file = os.path.join(os.path.dirname(__file__), '..', 'config', 'blocked_coins.txt')
         blocked_coins = set()
@@ -61,12 +74,14 @@ class Fresh1hAnalyzer:
         except Exception as e:
             print(f"⚠️ Error loading blocked coins: {e}")
         
-        return blocked_coins
+        # Read-only for the rest of the run (and shared by worker threads)
+        return frozenset(blocked_coins)
     
     def load_config(self):
         config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-        with open(config_path) as f:
-            return yaml.safe_load(f)
+        # Hand raw bytes to the loader - it decodes UTF-8 itself
+        with open(config_path, 'rb') as f:
+            return yaml.load(f.read(), Loader=SafeLoader)
     
     def load_market_data(self):
         """Load market data and filter out blocked coins"""
@@ -110,54 +125,91 @@ class Fresh1hAnalyzer:
         return filtered_coins
     
     def init_exchanges(self):
-        exchanges = []
-        
-        try:
-            bingx = ccxt.bingx({
+        """
+        Exchange client factories in fallback order
+        Clients are only built when a worker thread first needs them (see get_exchange)
+        ccxt's own throttle is per client, so it is off - _wait_for_exchange_slot paces all workers
+        """
+        return {
+            'BingX': lambda: ccxt.bingx({
                 'apiKey': os.getenv('BINGX_API_KEY', ''),
                 'secret': os.getenv('BINGX_SECRET_KEY', ''),
-                'rateLimit': 300,
-                'enableRateLimit': True,
+                'enableRateLimit': False,
                 'timeout': 30000,
-            })
-            exchanges.append(('BingX', bingx))
-        except Exception as e:
-            print(f"⚠️ BingX failed: {e}")
-        
-        try:
-            kucoin = ccxt.kucoin({
-                'rateLimit': 500,
-                'enableRateLimit': True,
+            }),
+            'KuCoin': lambda: ccxt.kucoin({
+                'enableRateLimit': False,
                 'timeout': 30000,
-            })
-            exchanges.append(('KuCoin', kucoin))
-        except Exception as e:
-            print(f"⚠️ KuCoin failed: {e}")
+            }),
+        }
+    
+    def get_exchange(self, exchange_name):
+        """Exchange client for the current worker thread (created on first use, None if it failed)"""
+        clients = getattr(self._thread_local, 'exchanges', None)
+        if clients is None:
+            clients = self._thread_local.exchanges = {}
+        
+        if exchange_name not in clients:
+            try:
+                client = self.exchange_factories[exchange_name]()
+            except Exception as e:
+                print(f"⚠️ {exchange_name} failed: {e}\n", end="")
+                clients[exchange_name] = None
+                return None
+            
+            try:
+                client.set_markets(*self.get_shared_markets(exchange_name, client))
+            except Exception as e:
+                # Not cached - the next coin on this thread retries the market download
+                print(f"⚠️ {exchange_name} markets failed: {str(e)[:100]}\n", end="")
+                return None
+            clients[exchange_name] = client
         
-        return exchanges
+        return clients[exchange_name]
+    
+    def get_shared_markets(self, exchange_name, client):
+        """(markets, currencies) for an exchange - loaded once through `client`, then reused by all threads"""
+        with self._markets_locks[exchange_name]:
+            if exchange_name not in self._markets:
+                self._wait_for_exchange_slot(exchange_name)
+                client.load_markets()
+                self._markets[exchange_name] = (client.markets, client.currencies)
+        return self._markets[exchange_name]
+    
+    def _wait_for_exchange_slot(self, exchange_name):
+        """Space request starts to one exchange by its configured rate limit (ms), across all workers"""
+        interval = self.config['apis'][exchange_name.lower()]['rate_limit'] / 1000
+        with self._rate_locks[exchange_name]:
+            now = time.monotonic()
+            wait_time = self._next_request_at[exchange_name] - now
+            self._next_request_at[exchange_name] = max(now, self._next_request_at[exchange_name]) + interval
+        if wait_time > 0:
+            time.sleep(wait_time)
     
     def is_coin_blocked(self, symbol):
-        """Check if coin is in blocked list"""
-        return symbol.upper() in self.blocked_coins
+        """Check if coin is in blocked list (symbol must already be uppercase)"""
+        return symbol in self.blocked_coins
     
     def fetch_1h_ohlcv(self, symbol):
         """Fetch 1-hour OHLCV data with timestamps"""
-        for exchange_name, exchange in self.exchanges:
+        for exchange_name in self.exchange_factories:
+            exchange = self.get_exchange(exchange_name)
+            if exchange is None:
+                continue
+            
             try:
+                self._wait_for_exchange_slot(exchange_name)
                 ohlcv = exchange.fetch_ohlcv(f"{symbol}/USDT", '1h', limit=200)
                 
                 if len(ohlcv) < 100:
                     continue
                 
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-                
-                # Keep UTC timestamps for freshness checking
-                df['utc_timestamp'] = df.index
-                
-                # Convert index to IST for display
-                df.index = df.index + pd.Timedelta(hours=5, minutes=30)
+                # One float64 block from the raw rows - no per-column dtype inference
+                # Index stays UTC - IST is only derived for display
+                # Volume is dropped: CipherB only reads OHLC
+                arr = np.asarray(ohlcv, dtype=np.float64)
+                index = pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms').rename('timestamp')
+                df = pd.DataFrame(arr[:, 1:5], columns=['open', 'high', 'low', 'close'], index=index)
                 
                 if len(df) > 50 and df['close'].iloc[-1] > 0:
                     return df, exchange_name
@@ -167,16 +219,17 @@ class Fresh1hAnalyzer:
         
         return None, None
     
-    def analyze_coin_fresh_signals(self, coin_data):
+    def analyze_coin_fresh_signals(self, coin_data, now=None):
         """
         Analyze for FRESH SIGNALS ONLY - 1h timeframe
         Includes blocked coin check for safety
+        `now` (UTC) is the run's reference time; defaults to the current time
         """
         symbol = coin_data.get('symbol', '').upper()
         
         # Double-check blocked coins (should already be filtered)
         if self.is_coin_blocked(symbol):
-            print(f"🚫 Skipping blocked coin: {symbol}")
+            print(f"🚫 Skipping blocked coin: {symbol}\n", end="")
             return None
         
         try:
@@ -194,55 +247,50 @@ class Fresh1hAnalyzer:
             
             # Only check the MOST RECENT CLOSED candle
             latest_signal = signals_df.iloc[-1]
-            signal_timestamp_utc = price_df['utc_timestamp'].iloc[-1]
-            signal_timestamp_ist = signals_df.index[-1]
+            signal_timestamp_utc = price_df.index[-1]
+            signal_timestamp_ist = signal_timestamp_utc + IST_OFFSET
             
             # Debug output for verification
-            current_time = datetime.utcnow()
+            current_time = now or datetime.utcnow()
             time_since_signal = current_time - signal_timestamp_utc.to_pydatetime()
+            signal_age_seconds = time_since_signal.total_seconds()
             
-            print(f"🔍 {symbol} - Signal age: {time_since_signal.total_seconds():.0f}s")
-            print(f"   Signal time (IST): {signal_timestamp_ist.strftime('%H:%M:%S')}")
-            print(f"   BUY: {latest_signal['buySignal']} | SELL: {latest_signal['sellSignal']}")
+            # Workers print concurrently: emit the whole block (newline included) as one write
+            print(
+                f"🔍 {symbol} - Signal age: {signal_age_seconds:.0f}s\n"
+                f"   Signal time (IST): {signal_timestamp_ist.strftime('%H:%M:%S')}\n"
+                f"   BUY: {latest_signal['buySignal']} | SELL: {latest_signal['sellSignal']}\n",
+                end=""
+            )
             
-            # Check for FRESH BUY signal
+            # BUY needs oversold and SELL overbought, so at most one can fire per bar
             if latest_signal['buySignal']:
-                if self.deduplicator.is_signal_fresh_and_new(symbol, 'BUY', signal_timestamp_utc):
-                    return {
-                        'symbol': symbol,
-                        'signal_type': 'BUY',
-                        'wt1': latest_signal['wt1'],
-                        'wt2': latest_signal['wt2'],
-                        'price': coin_data.get('current_price', 0),
-                        'change_24h': coin_data.get('price_change_percentage_24h', 0),
-                        'market_cap': coin_data.get('market_cap', 0),
-                        'exchange': exchange_used,
-                        'timestamp': signal_timestamp_ist,
-                        'signal_age_seconds': time_since_signal.total_seconds(),
-                        'coin_data': coin_data
-                    }
+                signal_type = 'BUY'
+            elif latest_signal['sellSignal']:
+                signal_type = 'SELL'
+            else:
+                return None
             
-            # Check for FRESH SELL signal
-            if latest_signal['sellSignal']:
-                if self.deduplicator.is_signal_fresh_and_new(symbol, 'SELL', signal_timestamp_utc):
-                    return {
-                        'symbol': symbol,
-                        'signal_type': 'SELL',
-                        'wt1': latest_signal['wt1'],
-                        'wt2': latest_signal['wt2'],
-                        'price': coin_data.get('current_price', 0),
-                        'change_24h': coin_data.get('price_change_percentage_24h', 0),
-                        'market_cap': coin_data.get('market_cap', 0),
-                        'exchange': exchange_used,
-                        'timestamp': signal_timestamp_ist,
-                        'signal_age_seconds': time_since_signal.total_seconds(),
-                        'coin_data': coin_data
-                    }
+            # Only alert on FRESH signals
+            if self.deduplicator.is_signal_fresh_and_new(symbol, signal_type, signal_timestamp_utc, current_time):
+                return Signal(
+                    symbol=symbol,
+                    signal_type=signal_type,
+                    wt1=latest_signal['wt1'],
+                    wt2=latest_signal['wt2'],
+                    price=coin_data.get('current_price', 0),
+                    change_24h=coin_data.get('price_change_percentage_24h', 0),
+                    market_cap=coin_data.get('market_cap', 0),
+                    exchange=exchange_used,
+                    timestamp=signal_timestamp_ist,
+                    signal_age_seconds=signal_age_seconds,
+                    coin_data=coin_data
+                )
             
             return None
             
         except Exception as e:
-            print(f"❌ {symbol} analysis failed: {str(e)[:100]}")
+            print(f"❌ {symbol} analysis failed: {str(e)[:100]}\n", end="")
             return None
     
     def run_fresh_analysis(self):
@@ -269,34 +317,40 @@ class Fresh1hAnalyzer:
         self.deduplicator.cleanup_old_signals()
         
         # Collect FRESH signals only (blocked coins already filtered, major coins prioritized)
-        fresh_signals = []
+        fresh_signals = new_signal_buckets()
         batch_size = 20
         total_analyzed = 0
+        workers = self.config.get('analysis', {}).get('workers', 4)
+        # One reference time for the whole run - signal ages are measured against it
+        run_time_utc = datetime.utcnow()
         
-        for i in range(0, len(self.market_data), batch_size):
-            batch = self.market_data[i:i + batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = (len(self.market_data) - 1) // batch_size + 1
-            
-            print(f"\n🔄 Processing batch {batch_num}/{total_batches}")
-            
-            for coin in batch:
-                signal_result = self.analyze_coin_fresh_signals(coin)
-                if signal_result:
-                    fresh_signals.append(signal_result)
-                    age_s = signal_result['signal_age_seconds']
-                    print(f"🚨 {signal_result['signal_type']}: {signal_result['symbol']} ({age_s:.0f}s ago)")
+        # Exchange fetches are network-bound, so coins in a batch are analyzed concurrently
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i in range(0, len(self.market_data), batch_size):
+                batch = self.market_data[i:i + batch_size]
+                batch_num = i // batch_size + 1
+                total_batches = (len(self.market_data) - 1) // batch_size + 1
+                
+                print(f"\n🔄 Processing batch {batch_num}/{total_batches}")
                 
-                total_analyzed += 1
-                time.sleep(0.3)  # Rate limiting
+                for signal_result in executor.map(self.analyze_coin_fresh_signals, batch, repeat(run_time_utc)):
+                    if signal_result:
+                        add_signal_to_buckets(fresh_signals, signal_result)
+                        age_s = signal_result.signal_age_seconds
+                        print(f"🚨 {signal_result.signal_type}: {signal_result.symbol} ({age_s:.0f}s ago)")
+                    
+                    total_analyzed += 1
+        
+        # Persist all newly alerted signals in one cache write
+        self.deduplicator.flush()
         
         # Send consolidated alert with FRESH signals only
-        if fresh_signals:
+        if fresh_signals['n']:
             success = send_consolidated_alert(fresh_signals, timeframe="1h")
             if success:
-                avg_age = sum(s['signal_age_seconds'] for s in fresh_signals) / len(fresh_signals)
+                avg_age = fresh_signals['age_sum'] / fresh_signals['n']
                 print(f"\n✅ SENT 1 FRESH 1H SIGNAL ALERT")
-                print(f"   Signals: {len(fresh_signals)}")
+                print(f"   Signals: {fresh_signals['n']}")
                 print(f"   Average age: {avg_age:.0f} seconds")
             else:
                 print(f"\n❌ Failed to send fresh signal alert")
@@ -307,9 +361,9 @@ class Fresh1hAnalyzer:
         print("🎯 FRESH 1H SIGNAL ANALYSIS COMPLETE")
         print("="*80)
         print(f"📊 Total analyzed: {total_analyzed}")
-        print(f"🚨 Fresh signals: {len(fresh_signals)}")
+        print(f"🚨 Fresh signals: {fresh_signals['n']}")
         print(f"🚫 Blocked coins: {len(self.blocked_coins)}")
-        print(f"📱 Alert sent: {'Yes' if fresh_signals else 'No'}")
+        print(f"📱 Alert sent: {'Yes' if fresh_signals['n'] else 'No'}")
         print(f"⏰ Next analysis: 1 hour (at :32 IST)")
         print("="*80)
 
@@ -7,21 +7,37 @@ Fetches top 500+ coins with API authentication
 import os
 import json
 import time
+import threading
 import requests
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # LibYAML bindings, parses in C
+except ImportError:
+    from yaml import SafeLoader
+
+# Only these CoinGecko fields are kept in the market data cache
+CACHED_COIN_FIELDS = (
+    'id', 'symbol', 'name', 'current_price', 'market_cap', 'market_cap_rank',
+    'total_volume', 'price_change_percentage_24h',
+)
+
 class CoinGeckoFetcher:
     def __init__(self):
         self.config = self.load_config()
         self.session = self.create_robust_session()
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
         
     def load_config(self):
         config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-        with open(config_path) as f:
-            return yaml.safe_load(f)
+        # Hand raw bytes to the loader - it decodes UTF-8 itself
+        with open(config_path, 'rb') as f:
+            return yaml.load(f.read(), Loader=SafeLoader)
     
     def create_robust_session(self):
         """Create requests session with API key authentication"""
@@ -59,6 +75,60 @@ class CoinGeckoFetcher:
         
         return session
     
+    def _wait_for_rate_limit(self):
+        """Space request starts by the configured CoinGecko rate limit (thread-safe)"""
+        interval = self.config['apis']['coingecko']['rate_limit']
+        with self._rate_lock:
+            now = time.monotonic()
+            wait_time = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+    
+    def _fetch_page(self, base_url, page, pages, per_page):
+        """Fetch a single /coins/markets page - [] when the API has no more data, None if every attempt failed"""
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': per_page,
+            'page': page,
+            'sparkline': 'false',
+            'price_change_percentage': '24h'
+        }
+        
+        print(f"📄 Fetching page {page}/{pages} (requesting {per_page} coins)\n", end="")
+        
+        max_attempts = 3
+        for attempt in range(max_attempts):
+            try:
+                self._wait_for_rate_limit()
+                url = f"{base_url}/coins/markets"
+                response = self.session.get(url, params=params, timeout=60)
+                
+                if response.status_code == 429:
+                    retry_after = response.headers.get('Retry-After', '60')
+                    wait_time = int(retry_after)
+                    print(f"⏳ Page {page} rate limited. Waiting {wait_time} seconds...\n", end="")
+                    time.sleep(wait_time + 1)
+                    continue
+                
+                response.raise_for_status()
+                data = response.json()
+                
+                if data:
+                    print(f"✅ Page {page}: {len(data)} coins fetched\n", end="")
+                return data or []
+                
+            except Exception as e:
+                print(f"❌ Page {page} attempt {attempt + 1} failed: {str(e)[:100]}\n", end="")
+                if attempt == max_attempts - 1:
+                    print(f"❌ All attempts failed for page {page}\n", end="")
+                    break
+                time.sleep((2 ** attempt) + 1)
+        
+        # None = page failed (skipped by the caller), [] = API has no more data
+        return None
+    
     def fetch_market_coins(self):
         """Fetch coins using Demo API key for higher limits"""
         base_url = self.config['apis']['coingecko']['base_url']
@@ -71,60 +141,27 @@ class CoinGeckoFetcher:
         
         print(f"📊 Target: {pages} pages × {per_page} coins = {pages * per_page} total coins")
         
-        for page in range(1, pages + 1):
-            params = {
-                'vs_currency': 'usd',
-                'order': 'market_cap_desc',
-                'per_page': per_page,
-                'page': page,
-                'sparkline': 'false',
-                'price_change_percentage': '24h'
-            }
-            
-            print(f"\n📄 Fetching page {page}/{pages} (requesting {per_page} coins)")
-            
-            max_attempts = 3
-            for attempt in range(max_attempts):
-                try:
-                    url = f"{base_url}/coins/markets"
-                    response = self.session.get(url, params=params, timeout=60)
-                    
-                    if response.status_code == 429:
-                        retry_after = response.headers.get('Retry-After', '60')
-                        wait_time = int(retry_after)
-                        print(f"⏳ Rate limited. Waiting {wait_time} seconds...")
-                        time.sleep(wait_time + 1)
-                        continue
-                    
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    if not data:
-                        print(f"📭 No data for page {page} - stopping")
-                        break
-                        
-                    coins.extend(data)
-                    print(f"✅ Page {page}: {len(data)} coins fetched")
-                    break
-                    
-                except Exception as e:
-                    print(f"❌ Attempt {attempt + 1} failed: {str(e)[:100]}")
-                    if attempt == max_attempts - 1:
-                        print(f"❌ All attempts failed for page {page}")
-                        break
-                    time.sleep((2 ** attempt) + 1)
-            
-            # Rate limiting between pages
-            if page < pages:
-                rate_limit_delay = self.config['apis']['coingecko']['rate_limit']
-                print(f"⏳ Waiting {rate_limit_delay}s before next page...")
-                time.sleep(rate_limit_delay)
+        # Pages are fetched concurrently; request starts stay spaced by the rate limit
+        with ThreadPoolExecutor(max_workers=max(1, min(4, pages))) as executor:
+            results = list(executor.map(
+                lambda page: self._fetch_page(base_url, page, pages, per_page),
+                range(1, pages + 1)
+            ))
+        
+        # Keep page order; skip pages that failed, stop at the first empty page
+        for page, data in enumerate(results, 1):
+            if data is None:
+                continue
+            if not data:
+                print(f"📭 No data for page {page} - stopping")
+                break
+            coins.extend(data)
 
         print(f"\n📊 Total coins fetched: {len(coins)}")
         return coins
     
     def filter_high_risk_coins(self, coins):
-        """Filter coins for 30m analysis"""
+        """Filter coins for 30m analysis, keeping only CACHED_COIN_FIELDS per coin"""
         print(f"\n🔍 Filtering coins for 30m analysis...")
         
         filtered_coins = []
@@ -136,7 +173,7 @@ class CoinGeckoFetcher:
                 
                 # More relaxed filters for 30m timeframe
                 if market_cap >= 100_000_000 and volume_24h >= 10_000_000:
-                    filtered_coins.append(coin)
+                    filtered_coins.append({field: coin.get(field) for field in CACHED_COIN_FIELDS})
                     
             except Exception as e:
                 print(f"⚠️ Error filtering coin {coin.get('symbol', 'UNKNOWN')}: {e}")
@@ -159,7 +196,7 @@ class CoinGeckoFetcher:
         }
         
         with open(cache_file, 'w') as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f)
         
         print(f"💾 Saved {len(coins)} coins to cache")
         return cache_file
@@ -36,31 +36,32 @@ def detect_exact_cipherb_signals(df, config):
     wt1 = ema(ci, wtAverageLen)  # ta.ema(ci, avg) = wtf1
     wt2 = sma(wt1, wtMALen)  # ta.sma(wtf1, malen) = wtf2
     
-    # Create results DataFrame
-    signals = pd.DataFrame(index=df.index)
-    signals['wt1'] = wt1
-    signals['wt2'] = wt2
+    # Crossover logic on raw NumPy arrays - [1:] is the current bar, [:-1] the previous
+    w1 = wt1.to_numpy()
+    w2 = wt2.to_numpy()
     
     # EXACT Pine Script conditions
-    # wtCross = ta.cross(wt1, wt2)
-    wt1_prev = wt1.shift(1)
-    wt2_prev = wt2.shift(1)
-    wtCross = ((wt1 > wt2) & (wt1_prev <= wt2_prev)) | ((wt1 < wt2) & (wt1_prev >= wt2_prev))
+    # wtCross = ta.cross(wt1, wt2)  (never true on the first bar)
+    wtCross = np.zeros(len(w1), dtype=bool)
+    wtCross[1:] = (((w1[1:] > w2[1:]) & (w1[:-1] <= w2[:-1])) |
+                   ((w1[1:] < w2[1:]) & (w1[:-1] >= w2[:-1])))
     
     # wtCrossUp = wt2 - wt1 <= 0
-    wtCrossUp = (wt2 - wt1) <= 0
-    
-    # wtCrossDown = wt2 - wt1 >= 0  
-    wtCrossDown = (wt2 - wt1) >= 0
+    # wtCrossDown = wt2 - wt1 >= 0
+    wt_diff = w2 - w1
+    wtCrossUp = wt_diff <= 0
+    wtCrossDown = wt_diff >= 0
     
     # wtOversold = wt1 <= -60 and wt2 <= -60
-    wtOversold = (wt1 <= osLevel2) & (wt2 <= osLevel2)
+    wtOversold = (w1 <= osLevel2) & (w2 <= osLevel2)
     
     # wtOverbought = wt2 >= 60 and wt1 >= 60
-    wtOverbought = (wt2 >= obLevel2) & (wt1 >= obLevel2)
-    
-    # EXACT Pine Script signal logic
-    signals['buySignal'] = wtCross & wtCrossUp & wtOversold
-    signals['sellSignal'] = wtCross & wtCrossDown & wtOverbought
+    wtOverbought = (w2 >= obLevel2) & (w1 >= obLevel2)
     
-    return signals
+    # EXACT Pine Script signal logic - results built in a single DataFrame construction
+    return pd.DataFrame({
+        'wt1': w1,
+        'wt2': w2,
+        'buySignal': wtCross & wtCrossUp & wtOversold,
+        'sellSignal': wtCross & wtCrossDown & wtOverbought,
+    }, index=df.index)